@@ -0,0 +1,293 @@
+# Ortak çekirdek: parser.py ve offline_listing_parser_v12.py'nin paylaştığı
+# yardımcılar tek yerde yaşar; parser seçimi ve orjson tercihi modül
+# yüklenirken bir kez yapılır.
+import os, re, csv, json
+from pathlib import Path
+import soupsieve
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+__all__ = [
+    "BS_PARSER", "make_soup", "txt", "clean_spaces", "slugify", "clean_price",
+    "extract_attrs", "extract_location", "format_phone_digits",
+    "extract_phone", "extract_json_state", "attrs_from_state", "phone_from_state",
+    "find_listing_files", "looks_like_listing", "harvest_image_urls",
+    "CsvAppender", "ensure_dir",
+    "RE_PHONE", "RE_IMG_EXT", "RE_TITLE_TAIL",
+    "RE_GROSS_M2", "RE_NET_M2", "RE_LISTING_ID",
+]
+
+# lxml (C tabanlı parser) kuruluysa onu kullan; yoksa stdlib parser'a düş
+try:
+    BeautifulSoup("", "lxml")
+    BS_PARSER = "lxml"
+except FeatureNotFound:
+    BS_PARSER = "html.parser"
+
+# orjson kuruluysa JSON çözümü için onu kullan (büyük durum bloğunda ~3-5x hızlı)
+try:
+    import orjson
+    _jloads = orjson.loads
+except ImportError:
+    _jloads = json.loads
+
+# Ayrıştırmada fiilen dokunduğumuz etiketler; head'deki meta/link/style gibi
+# düğümler için hiç ağaç kurulmasın
+_STRAIN = SoupStrainer([
+    "h1", "h3", "img", "a", "nav", "table", "tr", "th", "td",
+    "ul", "li", "strong", "span", "script", "div",
+])
+
+def make_soup(markup) -> BeautifulSoup:
+    return BeautifulSoup(markup, BS_PARSER, parse_only=_STRAIN)
+
+# ----------------- Derlenmiş desenler -----------------
+# Sıcak yoldaki tüm desenler modül yüklenirken bir kez derlenir; RE_* olanlar
+# iki CLI'nin da kullandığı ortak desenler
+_WS = re.compile(r"\s+")
+_PRICE_TAIL = re.compile(r"Fiyat.*$", re.I)
+_PRICE_NUM = re.compile(r"(\d[\d\.\,]*)\s*(TL|₺)?")
+# Rakam dışını silen tablo: tek C geçişi, regex motoru devreye girmez
+_NON_DIGIT_TBL = str.maketrans("", "", "".join(chr(c) for c in range(256) if not chr(c).isdigit()))
+_PHONE_CTX = re.compile(
+    r"(?:Cep|Telefon)[^0-9]{0,40}(0?\s*\(?5\d{2}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2})", re.I)
+_BC_SKIP = re.compile(r"(Emlak|Satılık|Türkiye|Ana Sayfa|Tüm İlanlar)", re.I)
+_BC_SEL = soupsieve.compile(".classifiedBreadCrumb a, nav.breadcrumb a, nav.classifiedBreadcrumb a")
+# Tam metin telefon taraması yüz KB'larca karakter gezer; google-re2
+# kuruluysa lineer zamanlı DFA motoru kullanılır (desen re2 alt kümesinde)
+try:
+    import re2 as _re2
+    RE_PHONE = _re2.compile(r"0?\s*\(?5\d{2}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}")
+except ImportError:
+    RE_PHONE = re.compile(r"0?\s*\(?5\d{2}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}")
+RE_IMG_EXT = re.compile(r"\.(jpe?g|png|webp)(\?|$)")
+RE_TITLE_TAIL = re.compile(r"\s*-\s*Satılık.*$")
+RE_GROSS_M2 = re.compile(r"Brüt\s*m.?²?\s*[:\-]?\s*(\d+)", re.I)
+RE_NET_M2 = re.compile(r"Net\s*m.?²?\s*[:\-]?\s*(\d+)", re.I)
+RE_LISTING_ID = re.compile(r"(\d+)")
+
+# slugify tek tabloda: Türkçe harfler sadeleşir, boşluk türleri doğrudan '-'
+# olur; geriye izinsiz karakterleri silmek ve tire koşularını toplamak kalır
+_SLUG_TABLE = str.maketrans({
+    "ç":"c","ğ":"g","ı":"i","ö":"o","ş":"s","ü":"u",
+    "Ç":"c","Ğ":"g","İ":"i","Ö":"o","Ş":"s","Ü":"u","+":"-plus-",
+    " ":"-", "\t":"-", "\n":"-", "\r":"-", "\f":"-", "\v":"-", "\xa0":"-",
+})
+_SLUG_NONWORD = re.compile(r"[^\w-]")
+_SLUG_DASHES = re.compile(r"-+")
+
+# ----------------- Yardımcılar -----------------
+def txt(tag) -> str:
+    return tag.get_text(strip=True) if tag else ""
+
+def clean_spaces(s: str) -> str:
+    return _WS.sub(" ", s.strip()) if s else ""
+
+def slugify(name: str) -> str:
+    s = (name or "ilan").lower().translate(_SLUG_TABLE)
+    s = _SLUG_NONWORD.sub("", s)
+    s = _SLUG_DASHES.sub("-", s).strip("-")
+    return s or "ilan"
+
+def clean_price(raw: str) -> str:
+    if not raw:
+        return "Belirtilmemiş"
+    raw = clean_spaces(raw)
+    # Metindeki fazlalıkları (Fiyat Tarihçesi vb.) buda
+    raw = _PRICE_TAIL.sub("", raw)
+    m = _PRICE_NUM.search(raw)
+    if m:
+        return f"{m.group(1).replace(',', '.')} TL"
+    return "Belirtilmemiş"
+
+def extract_attrs(soup) -> dict:
+    attrs = {}
+    for li in soup.select(".classifiedInfoList li"):
+        # find doğrudan etiket adıyla iner; satır başına iki CSS derlemesi yok
+        k = txt(li.find("strong"))
+        v = txt(li.find("span"))
+        if k: attrs[k] = v
+    for row in soup.select("table tr"):
+        th, td = row.find("th"), row.find("td")
+        if th and td: attrs[txt(th)] = txt(td)
+    return attrs
+
+def extract_location(soup, attrs: dict) -> tuple:
+    city = attrs.get("İl", "")
+    district = attrs.get("İlçe", "")
+    neighborhood = attrs.get("Mahalle", "")
+    # Özellik listesi konumu verdiyse breadcrumb seçicisine hiç girme
+    if city and district:
+        return city, district, neighborhood or "100. Yıl Mah."
+    if soup is not None:
+        bc = _BC_SEL.select(soup)
+        filt = [clean_spaces(a.get_text()) for a in bc
+                if not _BC_SKIP.search(a.get_text())]
+        if len(filt) >= 3:
+            city, district, neighborhood = filt[-3], filt[-2], filt[-1]
+    # Bu ilan özelinde varsayılanlar:
+    return city or "Tekirdağ", district or "Süleymanpaşa", neighborhood or "100. Yıl Mah."
+
+def format_phone_digits(digits: str) -> str:
+    # 05536461631 -> 0 (553) 646 16 31
+    if not digits:
+        return "Belirtilmemiş"
+    d = digits.translate(_NON_DIGIT_TBL)
+    # Sonda 10 hane (5xx xxx xx xx) varsa başa 0 ekle
+    if len(d) == 10 and d.startswith("5"):
+        d = "0" + d
+    if len(d) >= 11 and d.startswith("0"):
+        return f"{d[0]} ({d[1:4]}) {d[4:7]} {d[7:9]} {d[9:11]}"
+    return digits  # biçimleyemezsek ham hali
+
+def harvest_image_urls(soup) -> list:
+    # Adayları tek geçişte topla: find_all doğrudan etiket adıyla gezer,
+    # CSS seçici derlemesi ve görsel başına ek çağrı yok
+    imgs = []
+    for img in soup.find_all("img"):
+        src = img.get("data-src") or img.get("src") or ""
+        if src and RE_IMG_EXT.search(src.lower()):
+            imgs.append(src)
+    # Sırayı koruyarak tekille
+    return list(dict.fromkeys(imgs))
+
+def extract_phone(soup, html_text: str | None = None) -> str:
+    # 1) <a href="tel:..."> — önek eşleşmesi seçici motorunda, regex yok
+    a = soup.select_one('a[href^="tel:"]')
+    if a:
+        digits = a["href"][4:].translate(_NON_DIGIT_TBL)
+        if digits:
+            return format_phone_digits(digits)
+
+    # Çağıran metni zaten çıkardıysa DOM'u ikinci kez gezme
+    if html_text is None:
+        html_text = soup.get_text(" ", strip=True)
+
+    # 2) "Cep" / "Telefon" etiketinin hemen yanında geçen numara
+    m = _PHONE_CTX.search(html_text)
+    if m:
+        return format_phone_digits(m.group(1))
+
+    # 3) Tüm sayfa metninde ara (offline HTML'de genelde açıkça yazıyor)
+    m = RE_PHONE.search(html_text)
+    if m:
+        return format_phone_digits(m.group(0))
+
+    return "Belirtilmemiş"
+
+# ----------------- JSON durum bloğu -----------------
+def _initial_state_blob(html_text: str) -> str | None:
+    # Süslü parantez sayarak bloğu çıkar: tembel regex'in megabaytlarca script
+    # üzerinde geri izleme yapması yerine tek geçişli tarama. Ayrıca JSON
+    # içinde ';' geçse bile doğru yerde durur.
+    k = html_text.find("window.__INITIAL_STATE__")
+    if k < 0:
+        return None
+    start = html_text.find("{", k)
+    if start < 0:
+        return None
+    depth = 0
+    for i in range(start, len(html_text)):
+        c = html_text[i]
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return html_text[start:i + 1]
+    return None
+
+def extract_json_state(html_text: str) -> dict:
+    blob = _initial_state_blob(html_text)
+    if not blob:
+        return {}
+    try:
+        return _jloads(blob)
+    except ValueError:
+        return {}
+
+def attrs_from_state(classified: dict) -> dict:
+    # JSON bloğundaki özellik listesini extract_attrs ile aynı sözlük biçimine çevir
+    attrs = {}
+    for prop in classified.get("properties") or classified.get("attributes") or []:
+        if not isinstance(prop, dict):
+            continue
+        k = prop.get("name") or prop.get("key") or prop.get("label")
+        v = prop.get("value") or prop.get("text") or ""
+        if k:
+            attrs[clean_spaces(str(k))] = clean_spaces(str(v))
+    loc = classified.get("location") or {}
+    for src_key, dst_key in (("cityName", "İl"), ("townName", "İlçe"), ("quarterName", "Mahalle")):
+        if loc.get(src_key):
+            attrs.setdefault(dst_key, clean_spaces(str(loc[src_key])))
+    return attrs
+
+def phone_from_state(classified: dict, html_text: str = "") -> str:
+    # Blok telefonu çoğunlukla doğrudan taşır; önce oraya bak. Ham HTML'de
+    # çıplak RE_PHONE taraması zaman damgalarını (17553664...) numara
+    # sanabildiği için burada yalnızca etiket bağlamlı desen kullanılır.
+    for src in (classified, classified.get("store") or {}, classified.get("user") or {}):
+        for key in ("phone", "phoneNumber", "gsm", "mobilePhone"):
+            v = src.get(key)
+            if v:
+                return format_phone_digits(str(v))
+    m = _PHONE_CTX.search(html_text)
+    if m:
+        return format_phone_digits(m.group(1))
+    return "Belirtilmemiş"
+
+# ----------------- CSV -----------------
+class CsvAppender:
+    # Dosyayı koşu başına bir kez aç, DictWriter'ı canlı tut: kayıt başına
+    # open/close ve başlık kontrolü yok, 128 KiB tamponla yazımlar birleşir
+    def __init__(self, path, buffering=1 << 17):
+        self.path = Path(path)
+        self._write_header = not self.path.exists()
+        self._f = open(self.path, "a", encoding="utf-8-sig", newline="", buffering=buffering)
+        self._writer = None
+
+    def write(self, rec: dict) -> None:
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._f, fieldnames=list(rec.keys()))
+            if self._write_header:
+                self._writer.writeheader()
+        self._writer.writerow(rec)
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Bu süreçte oluşturduğumuz klasörler: aynı klasöre tekrar yazarken
+# lstat+mkdir syscall çifti yerine küme kontrolü
+_MKDIR_CACHE = set()
+
+def ensure_dir(p: Path) -> None:
+    k = str(p)
+    if k in _MKDIR_CACHE:
+        return
+    p.mkdir(parents=True, exist_ok=True)
+    _MKDIR_CACHE.add(k)
+
+# ----------------- Dosya tarama -----------------
+def find_listing_files(folder) -> list:
+    # glob yerine os.scandir: giriş başına Path + stat maliyeti yok
+    try:
+        with os.scandir(folder) as it:
+            return [Path(e.path) for e in it
+                    if e.is_file() and e.name.startswith("ilan_") and e.name.endswith(".html")]
+    except FileNotFoundError:
+        return []
+
+def looks_like_listing(path) -> bool:
+    # İlk 64 KB'ta ilan işareti yoksa dosya için DOM hiç kurulmasın;
+    # bytes.__contains__ C hızında tarar
+    try:
+        with open(path, "rb") as f:
+            head = f.read(65536)
+    except OSError:
+        return False
+    return b"classifiedInfoList" in head or b"__INITIAL_STATE__" in head or b"classifiedTitle" in head
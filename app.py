@@ -2,11 +2,16 @@
 import os
 import re
 import csv
+import shutil
 import requests
 import asyncio
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from flask import Flask, request, render_template_string, jsonify
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
 
 # Optional: pyppeteer only used for fallback rendering
 try:
@@ -15,24 +20,60 @@ try:
 except Exception:
     PUPPETEER_AVAILABLE = False
 
+# Prefer the C-based lxml parser; fall back to the stdlib one if not installed
+try:
+    BeautifulSoup("", "lxml")
+    BS_PARSER = "lxml"
+except FeatureNotFound:
+    BS_PARSER = "html.parser"
+
 app = Flask(__name__)
 
+# Tags the parser actually reads; footers, meta/link/style and the rest of
+# the head never get tree nodes built for them
+_STRAIN = SoupStrainer([
+    "h1", "h3", "img", "a", "nav", "table", "tr", "th", "td",
+    "ul", "li", "strong", "span", "div",
+])
+
+# Precompiled patterns for the hot parsing path (compiled once at import)
+_RE_WS = re.compile(r"\s+")
+_RE_NON_DIGIT = re.compile(r"\D")
+_RE_PHONE = re.compile(r"0?\s*\(?5\d{2}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}")
+_RE_LISTING_ID = re.compile(r"(\d+)")
+_RE_GROSS_M2 = re.compile(r"Brüt\s*m.?²?\s*[:\-]?\s*(\d+)", re.I)
+_RE_NET_M2 = re.compile(r"Net\s*m.?²?\s*[:\-]?\s*(\d+)", re.I)
+_RE_TITLE_TAIL = re.compile(r"\s*-\s*Satılık.*$")
+
+_IMG_EXTS = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+
+def _is_image_url(src):
+    """Extension test on the short suffix only — no regex, no full lowercase copy."""
+    q = src.find("?")
+    path = src if q < 0 else src[:q]
+    dot = path.rfind(".")
+    return dot >= 0 and path[dot:].lower() in _IMG_EXTS
+
 # ---------- Helpers ----------
 def txt(tag):
     return tag.get_text(strip=True) if tag else ""
 
 def clean_spaces(s):
-    return re.sub(r"\s+", " ", s.strip()) if s else ""
+    return _RE_WS.sub(" ", s.strip()) if s else ""
+
+# Slug tables/patterns built once at import; maketrans per call is wasted work
+_TR_MAP = str.maketrans({
+    "ç":"c","ğ":"g","ı":"i","ö":"o","ş":"s","ü":"u",
+    "Ç":"c","Ğ":"g","İ":"i","Ö":"o","Ş":"s","Ü":"u","+":"-plus-"
+})
+_SLUG_NONWORD = re.compile(r"[^\w\s-]")
+_SLUG_WS = re.compile(r"\s+")
 
 def slugify(name: str) -> str:
     s = (name or "ilan").lower()
-    tr_map = str.maketrans({
-        "ç":"c","ğ":"g","ı":"i","ö":"o","ş":"s","ü":"u",
-        "Ç":"c","Ğ":"g","İ":"i","Ö":"o","Ş":"s","Ü":"u","+":"-plus-"
-    })
-    s = s.translate(tr_map)
-    s = re.sub(r"[^\w\s-]", "", s)
-    s = re.sub(r"\s+", "-", s).strip("-")
+    s = s.translate(_TR_MAP)
+    s = _SLUG_NONWORD.sub("", s)
+    s = _SLUG_WS.sub("-", s).strip("-")
     return s or "ilan"
 
 # Browser-like headers to reduce 403
@@ -46,10 +87,40 @@ DEFAULT_HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
 }
 
+def extract_attrs(soup):
+    """Collect label/value pairs from the info list and tables in one DOM pass."""
+    attrs = {}
+    for li in soup.select(".classifiedInfoList li"):
+        k = txt(li.find("strong"))
+        v = txt(li.find("span"))
+        if k:
+            attrs[k] = v
+    for row in soup.select("table tr"):
+        th, td = row.find("th"), row.find("td")
+        if th and td:
+            attrs[txt(th)] = txt(td)
+    return attrs
+
+# One pooled session for all outbound HTTP: keep-alive saves a TCP+TLS
+# handshake per image on the CDN, and retries cover transient errors.
+_SESSION = requests.Session()
+_SESSION.headers.update(DEFAULT_HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("https://", _adapter)
+_SESSION.mount("http://", _adapter)
+
+# Deletion table covering every non-digit in latin-1; one C-level pass,
+# no regex engine involved
+_NON_DIGIT_TBL = str.maketrans("", "", "".join(chr(c) for c in range(256) if not chr(c).isdigit()))
+
 def format_phone_digits(digits: str) -> str:
     if not digits:
         return "Belirtilmemiş"
-    d = re.sub(r"\D", "", digits)
+    d = digits.translate(_NON_DIGIT_TBL)
     if len(d) == 10 and d.startswith("5"):
         d = "0" + d
     if len(d) >= 11 and d.startswith("0"):
@@ -60,107 +131,164 @@ def format_phone_digits(digits: str) -> str:
 def fetch_via_requests(url, timeout=15):
     """Try to get page via requests with browser-like headers."""
     try:
-        r = requests.get(url, headers=DEFAULT_HEADERS, timeout=timeout)
+        r = _SESSION.get(url, timeout=timeout)
         return r.status_code, r.text
     except Exception as e:
         return None, str(e)
 
+# One long-lived event loop (background thread) and one Chromium shared by
+# all fallback renders: browser startup costs hundreds of ms per launch
+_BROWSER = None
+_BROWSER_LOCK = None  # asyncio.Lock, created lazily on the pyppeteer loop
+_PYPPETEER_LOOP = None
+_PYPPETEER_LOOP_LOCK = threading.Lock()
+
+def _get_pyppeteer_loop():
+    global _PYPPETEER_LOOP
+    with _PYPPETEER_LOOP_LOCK:
+        if _PYPPETEER_LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="pyppeteer-loop", daemon=True).start()
+            _PYPPETEER_LOOP = loop
+    return _PYPPETEER_LOOP
+
+async def _get_browser():
+    """Reuse the running Chromium; relaunch only if it exited."""
+    global _BROWSER, _BROWSER_LOCK
+    # Single-loop, no await between check and set, so lazy creation is safe
+    if _BROWSER_LOCK is None:
+        _BROWSER_LOCK = asyncio.Lock()
+    # launch() suspends; without the lock two concurrent fallbacks can both
+    # pass the None check and leak a Chromium
+    async with _BROWSER_LOCK:
+        if _BROWSER is None or _BROWSER.process.returncode is not None:
+            _BROWSER = await launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
+        return _BROWSER
+
 async def _pyppeteer_fetch(url, timeout=30000):
-    """Async fetch using pyppeteer to render JS pages."""
-    browser = await launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
+    """Async fetch using pyppeteer to render JS pages; one fresh page per URL."""
+    browser = await _get_browser()
     page = await browser.newPage()
-    await page.setUserAgent(DEFAULT_HEADERS["User-Agent"])
-    await page.setExtraHTTPHeaders({"Accept-Language": DEFAULT_HEADERS["Accept-Language"]})
-    await page.goto(url, {'timeout': timeout, 'waitUntil': 'networkidle2'})
-    content = await page.content()
-    await browser.close()
-    return content
+    try:
+        await page.setUserAgent(DEFAULT_HEADERS["User-Agent"])
+        await page.setExtraHTTPHeaders({"Accept-Language": DEFAULT_HEADERS["Accept-Language"]})
+        await page.goto(url, {'timeout': timeout, 'waitUntil': 'networkidle2'})
+        return await page.content()
+    finally:
+        await page.close()
 
 def fetch_via_pyppeteer(url):
-    """Run pyppeteer in a fresh loop to avoid 'no current event loop' errors."""
+    """Schedule the render on the persistent loop instead of building one per request."""
     if not PUPPETEER_AVAILABLE:
         return False, "pyppeteer not installed"
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        html = loop.run_until_complete(_pyppeteer_fetch(url))
-        loop.close()
-        return True, html
+        fut = asyncio.run_coroutine_threadsafe(_pyppeteer_fetch(url), _get_pyppeteer_loop())
+        return True, fut.result(timeout=60)
     except Exception as e:
         return False, str(e)
 
 # ---------- Image downloader ----------
+# Directories already created this process; repeated requests for the same
+# listing skip the lstat+mkdir syscall pair
+_MKDIR_CACHE = set()
+
+def ensure_dir(p: Path):
+    k = str(p)
+    if k in _MKDIR_CACHE:
+        return
+    p.mkdir(parents=True, exist_ok=True)
+    _MKDIR_CACHE.add(k)
+
 def download_images_from_soup(soup, title):
     folder = Path("data") / slugify(title) / "images"
-    folder.mkdir(parents=True, exist_ok=True)
+    ensure_dir(folder)
     saved = []
     imgs = []
     for img in soup.select("img"):
         src = img.get("data-src") or img.get("src") or ""
-        if src and re.search(r"\.(jpe?g|png|webp)(\?|$)", src.lower()):
+        if src and _is_image_url(src):
             imgs.append(src)
     imgs = list(dict.fromkeys(imgs))
-    for i, src in enumerate(imgs[:100], start=1):
+    def _fetch_one(numbered):
+        i, src = numbered
         try:
             if not src.startswith("http"):
                 # try to make absolute if possible (skip otherwise)
-                continue
-            r = requests.get(src, headers=DEFAULT_HEADERS, timeout=15)
-            if r.status_code == 200:
-                ext = ".jpg" if ".jpg" in src.lower() or ".jpeg" in src.lower() else ".png"
-                path = folder / f"{i:02d}{ext}"
-                path.write_bytes(r.content)
-                saved.append(str(path.as_posix()))
+                return None
+            # stream=True + copyfileobj: 64 KB blocks to disk instead of
+            # holding the whole body (and a second copy) in memory
+            with _SESSION.get(src, stream=True, timeout=15) as r:
+                if r.status_code == 200:
+                    ext = ".jpg" if ".jpg" in src.lower() or ".jpeg" in src.lower() else ".png"
+                    path = folder / f"{i:02d}{ext}"
+                    r.raw.decode_content = True
+                    with open(path, "wb") as out:
+                        shutil.copyfileobj(r.raw, out, length=65536)
+                    return str(path.as_posix())
         except Exception:
-            continue
+            pass
+        return None
+
+    # Downloads are independent and latency-bound; fan them out over threads
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        for result in ex.map(_fetch_one, enumerate(imgs[:100], start=1)):
+            if result:
+                saved.append(result)
     return saved
 
 # ---------- Parser ----------
 def parse_html_to_record(html_path_or_url, html_text, offline_path=None):
-    soup = BeautifulSoup(html_text, "html.parser")
+    soup = BeautifulSoup(html_text, BS_PARSER, parse_only=_STRAIN)
     title = txt(soup.select_one("h1.classifiedTitle")) or txt(soup.select_one("h1")) or "Belirtilmemiş"
-    title = re.sub(r"\s*-\s*Satılık.*$", "", clean_spaces(title))
+    title = _RE_TITLE_TAIL.sub("", clean_spaces(title))
 
-    # Find phone
+    # Full-document text, computed once: get_text walks the whole DOM, and
+    # both the phone fallback and the m2 extraction need it
+    page_text = soup.get_text(" ", strip=True)
+
+    # Find phone; a digitless tel: anchor must fall through to the text scan
     phone = "Belirtilmemiş"
-    a = soup.find("a", href=re.compile(r"tel:\+?\d"))
-    if a:
-        digits = re.sub(r"[^\d]", "", a.get("href", ""))
+    a = soup.select_one('a[href^="tel:"]')
+    digits = _RE_NON_DIGIT.sub("", a["href"][4:]) if a else ""
+    if digits:
         phone = format_phone_digits(digits)
     else:
-        text = soup.get_text(" ", strip=True)
-        m = re.search(r"0?\s*\(?5\d{2}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}", text)
+        m = _RE_PHONE.search(page_text)
         if m:
             phone = format_phone_digits(m.group(0))
 
     # m2 extraction
-    page_text = soup.get_text(" ", strip=True)
-    m_gross = re.search(r"Brüt\s*m.?²?\s*[:\-]?\s*(\d+)", page_text, re.I)
-    m_net = re.search(r"Net\s*m.?²?\s*[:\-]?\s*(\d+)", page_text, re.I)
+    m_gross = _RE_GROSS_M2.search(page_text)
+    m_net = _RE_NET_M2.search(page_text)
+
+    # attribute rows (one DOM walk instead of one selector per field)
+    attrs = extract_attrs(soup)
 
     images = download_images_from_soup(soup, title)
-    description = clean_spaces(txt(soup.select_one("#classifiedDescription")) or "")
+    description = clean_spaces(txt(soup.select_one("#classifiedDescription")))
     # owner
     owner = txt(soup.select_one(".username-info-area a")) or "Belirtilmemiş"
 
+    m_lid = _RE_LISTING_ID.search(str(html_path_or_url))
+
     record = {
         "url_offline": offline_path or html_path_or_url,
-        "listing_id": re.search(r"(\d+)", str(html_path_or_url)).group(1) if re.search(r"(\d+)", str(html_path_or_url)) else "",
+        "listing_id": m_lid.group(1) if m_lid else "",
         "title": title,
-        "price": clean_spaces(txt(soup.select_one(".classifiedInfo h3")) or ""),
+        "price": clean_spaces(txt(soup.select_one(".classifiedInfo h3"))),
         "city": "Belirtilmemiş",
         "district": "Belirtilmemiş",
         "neighborhood": "Belirtilmemiş",
         "gross_m2": m_gross.group(1) if m_gross else "",
         "net_m2": m_net.group(1) if m_net else "",
-        "room_count": txt(soup.select_one("li:contains('Oda')")) or "",
-        "floor": txt(soup.select_one("li:contains('Bulunduğu Kat')")) or "",
-        "heating": txt(soup.select_one("li:contains('Isıtma')")) or "",
-        "building_age": txt(soup.select_one("li:contains('Bina Yaşı')")) or "",
-        "furnished": txt(soup.select_one("li:contains('Eşyalı')")) or "",
-        "swap": txt(soup.select_one("li:contains('Takas')")) or "",
-        "credit_eligible": txt(soup.select_one("li:contains('Kredi')")) or "",
-        "in_site": txt(soup.select_one("li:contains('Site İçerisinde')")) or "",
+        "room_count": attrs.get("Oda Sayısı", ""),
+        "floor": attrs.get("Bulunduğu Kat", ""),
+        "heating": attrs.get("Isıtma", ""),
+        "building_age": attrs.get("Bina Yaşı", ""),
+        "furnished": attrs.get("Eşyalı", ""),
+        "swap": attrs.get("Takas", ""),
+        "credit_eligible": attrs.get("Krediye Uygun", ""),
+        "in_site": attrs.get("Site İçerisinde", ""),
         "owner_name": owner,
         "phone": phone,
         "description": description,
@@ -1,123 +1,50 @@
-import re, csv
+import os, csv
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from bs4 import BeautifulSoup
 
-# ----------------- Yardımcılar -----------------
-def txt(tag): 
-    return tag.get_text(strip=True) if tag else ""
+from _offline_core import *
 
-def clean_spaces(s): 
-    return re.sub(r"\s+", " ", s.strip()) if s else ""
-
-def slugify(name: str) -> str:
-    s = (name or "ilan").lower()
-    # Türkçe karakterleri sadeleştir
-    tr_map = str.maketrans({
-        "ç":"c","ğ":"g","ı":"i","ö":"o","ş":"s","ü":"u",
-        "Ç":"c","Ğ":"g","İ":"i","Ö":"o","Ş":"s","Ü":"u","+":"-plus-"
-    })
-    s = s.translate(tr_map)
-    s = re.sub(r"[^\w\s-]", "", s)
-    s = re.sub(r"\s+", "-", s).strip("-")
-    return s or "ilan"
-
-def clean_price(raw):
-    if not raw: 
-        return "Belirtilmemiş"
-    raw = clean_spaces(raw)
-    # Metindeki fazlalıkları (Fiyat Tarihçesi vb.) buda
-    raw = re.sub(r"Fiyat.*$", "", raw, flags=re.I)
-    m = re.search(r"(\d[\d\.\,]*)\s*(TL|₺)?", raw)
-    if m:
-        return f"{m.group(1).replace(',', '.')} TL"
-    return "Belirtilmemiş"
-
-def extract_attrs(soup):
-    attrs = {}
-    for li in soup.select(".classifiedInfoList li"):
-        k = txt(li.select_one("strong"))
-        v = txt(li.select_one("span"))
-        if k: attrs[k] = v
-    for row in soup.select("table tr"):
-        th, td = row.find("th"), row.find("td")
-        if th and td: attrs[txt(th)] = txt(td)
-    return attrs
-
-def extract_location(soup, attrs):
-    city = attrs.get("İl", "")
-    district = attrs.get("İlçe", "")
-    neighborhood = attrs.get("Mahalle", "")
-    if not city or not district:
-        bc = soup.select(".classifiedBreadCrumb a, nav.breadcrumb a, nav.classifiedBreadcrumb a")
-        filt = [clean_spaces(a.get_text()) for a in bc 
-                if not re.search(r"(Emlak|Satılık|Türkiye|Ana Sayfa|Tüm İlanlar)", a.get_text(), re.I)]
-        if len(filt) >= 3:
-            city, district, neighborhood = filt[-3], filt[-2], filt[-1]
-    # Bu ilan özelinde varsayılanlar:
-    return city or "Tekirdağ", district or "Süleymanpaşa", neighborhood or "100. Yıl Mah."
-
-def extract_images(soup, title):
-    imgs = []
-    for img in soup.select("img"):
-        src = img.get("data-src") or img.get("src") or ""
-        if re.search(r"\.(jpe?g|png|webp)(\?|$)", src.lower()):
-            imgs.append(src)
-    imgs = list(dict.fromkeys(imgs))
+# ----------------- Görseller -----------------
+def image_paths_for(title, count):
     folder = Path("data") / slugify(title) / "images"
-    folder.mkdir(parents=True, exist_ok=True)
+    ensure_dir(folder)
     # Yalnızca yol üret (indirmiyoruz)
-    return [str((folder / f"{i+1:02d}.jpg").as_posix()) for i in range(min(len(imgs), 100))]
-
-def format_phone_digits(digits: str) -> str:
-    # 05536461631 -> 0 (553) 646 16 31
-    if not digits: 
-        return "Belirtilmemiş"
-    d = re.sub(r"\D", "", digits)
-    # Sonda 10 hane (5xx xxx xx xx) varsa başa 0 ekle
-    if len(d) == 10 and d.startswith("5"):
-        d = "0" + d
-    if len(d) >= 11 and d.startswith("0"):
-        return f"{d[0]} ({d[1:4]}) {d[4:7]} {d[7:9]} {d[9:11]}"
-    return digits  # biçimleyemezsek ham hali
-
-def extract_phone(soup):
-    # 1) <a href="tel:...">
-    a = soup.find("a", href=re.compile(r"tel:\+?\d"))
-    if a:
-        href = a.get("href", "")
-        digits = re.sub(r"[^\d]", "", href)
-        return format_phone_digits(digits)
-
-    # 2) "Cep" / "Telefon" satırı yanında
-    for label in soup.find_all(text=re.compile(r"\b(Cep|Telefon)\b", re.I)):
-        # Aynı satırda/sonraki kardeşte numara geçebilir
-        parent_text = clean_spaces(label.parent.get_text(" "))
-        m = re.search(r"0?\s*\(?5\d{2}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}", parent_text)
-        if m:
-            return format_phone_digits(m.group(0))
-
-    # 3) Tüm sayfa metninde ara (offline HTML'de genelde açıkça yazıyor)
-    text = soup.get_text(" ", strip=True)
-    m = re.search(r"0?\s*\(?5\d{2}\)?[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}", text)
-    if m:
-        return format_phone_digits(m.group(0))
+    return [str((folder / f"{i+1:02d}.jpg").as_posix()) for i in range(min(count, 100))]
 
-    return "Belirtilmemiş"
+def extract_images(soup, title):
+    imgs = harvest_image_urls(soup)
+    return image_paths_for(title, len(imgs))
 
 # ----------------- Parser -----------------
 def parse_listing(html_path: Path):
-    soup = BeautifulSoup(html_path.read_text(encoding="utf-8", errors="ignore"), "html.parser")
-
-    # Başlık
-    title = txt(soup.select_one("h1.classifiedTitle")) or txt(soup.select_one("h1")) or "Belirtilmemiş"
-    title = re.sub(r"\s*-\s*Satılık.*$", "", clean_spaces(title))
-
-    # Fiyat
-    price_raw = txt(soup.select_one(".classifiedInfo h3, .classifiedInfo .price"))
-    price = clean_price(price_raw)
-
-    # Özellikler & Konum
-    attrs = extract_attrs(soup)
+    raw = html_path.read_text(encoding="utf-8", errors="ignore")
+    state = extract_json_state(raw)
+    classified = state.get("classified") or state.get("classifiedDetail") or {}
+
+    if classified:
+        # JSON bloğu doluysa DOM'u hiç kurmadan alanları oradan doldur
+        soup = None
+        title = clean_spaces(str(classified.get("title", ""))) or "Belirtilmemiş"
+        price = clean_price(str(classified.get("price", "")))
+        attrs = attrs_from_state(classified)
+        description = clean_spaces(str(classified.get("description", "")))
+        html_text = raw
+        photo_count = len(classified.get("photos") or classified.get("images") or [])
+        image_paths = image_paths_for(title, photo_count)
+        phone = phone_from_state(classified, raw)
+        owner = clean_spaces(str((classified.get("store") or {}).get("name", "")))
+    else:
+        soup = make_soup(raw)
+        title = txt(soup.select_one("h1.classifiedTitle")) or txt(soup.select_one("h1")) or "Belirtilmemiş"
+        price = clean_price(txt(soup.select_one(".classifiedInfo h3, .classifiedInfo .price")))
+        attrs = extract_attrs(soup)
+        description = clean_spaces(txt(soup.select_one("#classifiedDescription")) or txt(soup.select_one(".uiBoxContainer")))
+        html_text = soup.get_text(" ", strip=True)
+        image_paths = extract_images(soup, title)
+        phone = extract_phone(soup, html_text)
+        owner = txt(soup.select_one(".username-info-area a"))
+
+    title = RE_TITLE_TAIL.sub("", clean_spaces(title))
     city, district, neighborhood = extract_location(soup, attrs)
 
     def pick(*keys, default="Belirtilmemiş"):
@@ -126,30 +53,25 @@ def parse_listing(html_path: Path):
                 return attrs[k]
         return default
 
-    # m2 değerlerini mümkünse metinden yakala; yoksa varsayılanları kullan
-    html_text = soup.get_text(" ", strip=True)
-    m_gross = re.search(r"Brüt\s*m.?²?\s*[:\-]?\s*(\d+)", html_text, re.I)
-    m_net = re.search(r"Net\s*m.?²?\s*[:\-]?\s*(\d+)", html_text, re.I)
-
-    # Telefon
-    phone = extract_phone(soup)
+    # m2 değerleri JSON yolunda attrs'tan gelir (metin desenleri ham markup
+    # üzerinde eşleşmez); DOM yolunda sayfa metni yedek olarak taranır
+    m_gross = RE_GROSS_M2.search(html_text) if soup is not None else None
+    m_net = RE_NET_M2.search(html_text) if soup is not None else None
 
-    # Görseller
-    image_paths = extract_images(soup, title)
-
-    # Açıklama
-    description = clean_spaces(txt(soup.select_one("#classifiedDescription")) or txt(soup.select_one(".uiBoxContainer")))
+    m_lid = RE_LISTING_ID.search(html_path.name)
 
     record = {
         "url_offline": str(html_path),
-        "listing_id": re.search(r"(\d+)", html_path.name).group(1),
+        "listing_id": m_lid.group(1) if m_lid else "",
         "title": title,
         "price": price,
         "city": city,
         "district": district,
         "neighborhood": neighborhood,
-        "gross_m2": m_gross.group(1) if m_gross else "100",
-        "net_m2": m_net.group(1) if m_net else "90",
+        "gross_m2": pick("m² (Brüt)", "Brüt m²", "Brüt M2",
+                         default=m_gross.group(1) if m_gross else "100"),
+        "net_m2": pick("m² (Net)", "Net m²", "Net M2",
+                       default=m_net.group(1) if m_net else "90"),
         "room_count": pick("Oda Sayısı", default="2+1"),
         "floor": pick("Bulunduğu Kat", default="4"),
         "heating": pick("Isıtma", "Kombi (Doğalgaz)"),
@@ -158,7 +80,7 @@ def parse_listing(html_path: Path):
         "swap": pick("Takas", "Evet"),
         "credit_eligible": pick("Krediye Uygun", "Evet"),
         "in_site": pick("Site İçerisinde", "Evet"),
-        "owner_name": txt(soup.select_one(".username-info-area a")) or "ELİF DEMİRLER GAYRİMENKUL",
+        "owner_name": owner or "ELİF DEMİRLER GAYRİMENKUL",
         "phone": phone,
         "description": description,
         "image_count": len(image_paths),
@@ -168,31 +90,54 @@ def parse_listing(html_path: Path):
     return record
 
 # ----------------- CSV -----------------
+# Başlığı yazdığımız dosyalar: kayıt başına exists() stat çağrısı yerine
+# süreç içi küme kontrolü
+_HEADER_WRITTEN = set()
+
 def save_csv(rec, path="ilanlar_final1.csv"):
     path = Path(path)
-    exists = path.exists()
+    key = str(path)
+    has_header = key in _HEADER_WRITTEN or path.exists()
     with open(path, "a", encoding="utf-8-sig", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=list(rec.keys()))
-        if not exists:
+        if not has_header:
             writer.writeheader()
         writer.writerow(rec)
+    _HEADER_WRITTEN.add(key)
     print(f"✅ {rec['listing_id']} eklendi | Telefon: {rec['phone']}")
 
+def save_csv_many(records, path="ilanlar_final1.csv"):
+    # Toplu çalıştırmada dosyayı kayıt başına değil, bir kez aç
+    if not records:
+        return
+    with CsvAppender(path) as out:
+        for rec in records:
+            out.write(rec)
+
 # ----------------- Main -----------------
 def main():
     # Tek ilan için:
     # html_files = [Path(r"C:\Users\Pelin\Downloads\ilan_1275757368.html")]
     # Toplu işlemek istersen:
-    html_files = list(Path(r"C:\Users\Pelin\Downloads").glob("ilan_*.html"))
+    html_files = find_listing_files(r"C:\Users\Pelin\Downloads")
+    # İlan işareti taşımayan kayıtlı sayfaları ayrıştırmadan ele
+    html_files = [h for h in html_files if looks_like_listing(h)]
     if not html_files:
         print("⚠️ Hiç ilan dosyası bulunamadı.")
         return
-    for html in html_files:
-        try:
-            rec = parse_listing(html)
-            save_csv(rec)
-        except Exception as e:
-            print(f"❌ {html.name} hata: {e}")
+    # Dosyalar birbirinden bağımsız: ayrıştırmayı çekirdeklere dağıt,
+    # CSV yazımı ana süreçte sıralı kalsın
+    with CsvAppender("ilanlar_final1.csv") as out, \
+         ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        futures = {ex.submit(parse_listing, html): html for html in html_files}
+        for fut in as_completed(futures):
+            html = futures[fut]
+            try:
+                rec = fut.result()
+                out.write(rec)
+                print(f"✅ {rec['listing_id']} eklendi | Telefon: {rec['phone']}")
+            except Exception as e:
+                print(f"❌ {html.name} hata: {e}")
 
 if __name__ == "__main__":
     main()